@@ -8,17 +8,117 @@
 """
 
 import os
+import stat
 import time
-import hashlib
+import asyncio
+import functools
+import hmac
+import io
+import shutil
 import uuid
 import json
-from typing import List, Dict, Optional, Any
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Any, BinaryIO, Callable, Iterator, Tuple
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 
-from utils.file_hash_direct import FileHashCalculator
+from utils.file_hash_direct import DEFAULT_CHUNK_SIZE, SUPPORTED_ALGORITHMS, calculate_file_hash, get_calculator, new_hasher
+from utils.hash_cache import HashCache
+from api.task_store import TaskStore
+
+# 批处理任务使用的线程池。hashlib 处理大块数据时释放 GIL，多个线程可以同时计算，
+# 线程数取CPU核数的两倍（不超过32），使一部分线程等待磁盘读取时其他线程仍在计算；
+# 与进程池相比不需要 fork 工作进程，也不需要在进程间传递参数和结果
+def _new_batch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2), thread_name_prefix="hash-batch")
+
+_POOL = _new_batch_pool()
+
+# 小于该大小（字节）的文件不单独提交到线程池，而是分组后批量计算
+SMALL_FILE_THRESHOLD = 64 * 1024
+
+# 每个线程池任务中批量计算的小文件数
+SMALL_FILE_BATCH_SIZE = 64
+
+# 单个请求中同时计算哈希值的上传文件数上限
+MAX_CONCURRENT_UPLOADS = 32
+
+# 读取上传文件的最小块大小（字节）。客户端传入的 chunk_size 过小时，每块都要进出一次 C 层
+# 并重新获取 GIL，按该值读取可让 hashlib 在释放 GIL 的状态下一次处理足够多的数据
+MIN_UPLOAD_READ_SIZE = DEFAULT_CHUNK_SIZE
+
+# 支持的哈希算法在进程运行期间不会变化，模块加载时计算一次
+_ALGO_SET = SUPPORTED_ALGORITHMS
+_ALGO_SORTED = sorted(_ALGO_SET)
+
+def _default_hash_cache_path() -> str:
+    """
+    哈希缓存的默认位置：当前用户缓存目录（$XDG_CACHE_HOME 或 ~/.cache）下仅属主可访问的子目录。
+    缓存内容会被直接当作计算结果返回，不能放在其他用户可以预先创建或写入的共享目录（如 /tmp）中。
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    cache_dir = os.path.join(cache_home, "file_hash_api")
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    return os.path.join(cache_dir, "hash_cache.sqlite3")
+
+def _open_hash_cache() -> Optional[HashCache]:
+    """打开目录批处理的哈希缓存，HASH_CACHE_PATH 设为空字符串或数据库无法打开时禁用缓存"""
+    try:
+        db_path = os.environ.get("HASH_CACHE_PATH")
+        if db_path is None:
+            db_path = _default_hash_cache_path()
+        if not db_path:
+            return None
+        return HashCache(db_path)
+    except (OSError, sqlite3.Error):
+        return None
+
+hash_cache = _open_hash_cache()
+
+# 请求处理中同时进行的哈希计算数上限，超出的请求排队等待，避免突发请求同时读取大量文件。
+# 至少为 1：为 0 时请求会一直等待，为负数时无法创建信号量和线程池
+HASH_CONCURRENCY = max(1, int(os.environ.get("HASH_CONCURRENCY", os.cpu_count() or 1)))
+
+# 请求处理中的哈希计算专用线程池，与上传文件保存等其他阻塞操作使用的默认线程池分开
+def _new_hash_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=32, thread_name_prefix="hash")
+
+_HASH_POOL = _new_hash_pool()
+
+# 限制同时进行的哈希计算数的信号量。Python 3.9 中 asyncio.Semaphore 创建时即绑定当前事件循环，
+# 因此在应用启动时（或首次使用时）于事件循环内创建
+_HASH_SEM: Optional[asyncio.Semaphore] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：按CPU核数设置默认线程池，创建哈希计算信号量和线程池，退出时关闭线程池。
+    每次启动都重新创建线程池，同一进程中应用可以多次启动（如多个 TestClient 或内嵌服务器重启）。
+    """
+    global _POOL, _HASH_POOL, _HASH_SEM
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=os.cpu_count()))
+    previous_pools = (_POOL, _HASH_POOL)
+    _POOL = _new_batch_pool()
+    _HASH_POOL = _new_hash_pool()
+    for pool in previous_pools:
+        pool.shutdown(wait=False)
+    _HASH_SEM = asyncio.Semaphore(HASH_CONCURRENCY)
+    yield
+    _POOL.shutdown(wait=False)
+    _HASH_POOL.shutdown(wait=False)
+    # 删除保存在磁盘上的任务结果
+    batch_tasks.clear()
+    upload_batch_tasks.clear()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -27,6 +127,7 @@ app = FastAPI(
     version="1.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "基础信息",
@@ -55,11 +156,28 @@ app = FastAPI(
     ]
 )
 
+# 任务存储的容量上限和过期时间（秒），超过过期时间未被访问的任务会被删除
+TASK_STORE_MAXSIZE = int(os.environ.get("TASK_STORE_MAXSIZE", "10000"))
+TASK_TTL = float(os.environ.get("TASK_TTL", "3600"))
+
+def _discard_results(task_id: str, task: Dict[str, Any]):
+    """
+    任务从存储中删除时，一并删除保存在磁盘上的任务结果。
+    先标记任务已删除：任务仍在运行时，之后写入的结果文件由 _store_results 负责删除。
+    """
+    task["_evicted"] = True
+    results_path = task.get("_results_path")
+    if results_path is not None:
+        try:
+            os.remove(results_path)
+        except OSError:
+            pass
+
 # 存储异步任务信息
-batch_tasks: Dict[str, Dict[str, Any]] = {}
+batch_tasks = TaskStore(maxsize=TASK_STORE_MAXSIZE, ttl=TASK_TTL, on_evict=_discard_results)
 
 # 存储异步上传文件哈希任务信息
-upload_batch_tasks: Dict[str, Dict[str, Any]] = {}
+upload_batch_tasks = TaskStore(maxsize=TASK_STORE_MAXSIZE, ttl=TASK_TTL, on_evict=_discard_results)
 
 # 模型定义
 class HashResponse(BaseModel):
@@ -75,6 +193,7 @@ class BatchTaskRequest(BaseModel):
     directory: str
     recursive: bool = False
     algorithm: str = "sha256"
+    use_cache: bool = True
 
 class BatchTaskResponse(BaseModel):
     task_id: str
@@ -103,7 +222,7 @@ class BatchTaskResults(BaseModel):
 
 class BatchFileHashRequest(BaseModel):
     algorithm: str = "sha256"
-    chunk_size: int = 4096
+    chunk_size: int = DEFAULT_CHUNK_SIZE
 
 class BatchFileHashResponse(BaseModel):
     results: List[HashResponse]
@@ -114,7 +233,7 @@ class BatchFileHashResponse(BaseModel):
 
 class AsyncUploadHashRequest(BaseModel):
     algorithm: str = "sha256"
-    chunk_size: int = 4096
+    chunk_size: int = DEFAULT_CHUNK_SIZE
 
 class AsyncUploadHashResponse(BaseModel):
     task_id: str
@@ -163,6 +282,128 @@ class BatchVerifyResponse(BaseModel):
     mismatch_count: int
     total_processing_time: float
 
+def _json_loads(data: str) -> Any:
+    """解析JSON字符串，已安装 orjson 时使用 orjson（orjson.JSONDecodeError 是 json.JSONDecodeError 的子类）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dump_json(content: Any) -> bytes:
+    """将内容序列化为JSON字节串，已安装 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _json_response(content: Any) -> Response:
+    """
+    直接返回序列化好的JSON响应。用于结果由服务端自行构造的高扇出端点：
+    返回 Response 时 FastAPI 会跳过 response_model 的校验和序列化，response_model 仅用于生成文档
+    """
+    return Response(content=_dump_json(content), media_type="application/json")
+
+# /algorithms 的响应体固定不变，预先序列化
+_ALGORITHMS_JSON = _dump_json({"algorithms": _ALGO_SORTED})
+
+def _check_chunk_size(chunk_size: int):
+    """检查客户端传入的块大小，不是正整数时返回400"""
+    if chunk_size <= 0:
+        raise HTTPException(status_code=400, detail=f"chunk_size必须是正整数: {chunk_size}")
+
+def _parse_hex(value: str) -> Optional[bytes]:
+    """将十六进制哈希字符串解码为字节（不区分大小写），格式无效时返回 None"""
+    # bytes.fromhex 会忽略空白字符，而哈希值本身不含空白，含空白的输入视为无效
+    if not isinstance(value, str) or not value.isalnum():
+        return None
+    try:
+        return bytes.fromhex(value)
+    except (TypeError, ValueError):
+        return None
+
+def _hash_stream(stream: BinaryIO, algorithm: str, chunk_size: int) -> bytes:
+    """
+    从头分块读取文件对象并直接送入哈希对象，返回原始摘要字节，不在内存中缓存整个文件，也不写临时文件。
+    上传文件即 Starlette 已经接收好的 SpooledTemporaryFile，直接读取即可，无需再复制一份。
+    """
+    # 其他代码（如中间件或 UploadFile 的方法）可能已移动读取位置
+    stream.seek(0)
+    hash_obj = new_hasher(algorithm)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        hash_obj.update(chunk)
+    return hash_obj.digest()
+
+async def _run_hash(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    在哈希计算专用线程池中执行 func(*args)，避免长时间的哈希计算阻塞事件循环。
+    同时进行的计算不超过 HASH_CONCURRENCY 个，其余调用在事件循环中等待。
+    """
+    global _HASH_SEM
+    if _HASH_SEM is None:
+        _HASH_SEM = asyncio.Semaphore(HASH_CONCURRENCY)
+    async with _HASH_SEM:
+        return await asyncio.get_running_loop().run_in_executor(_HASH_POOL, functools.partial(func, *args))
+
+async def _hash_upload(file: UploadFile, algorithm: str, chunk_size: int) -> bytes:
+    """在哈希计算线程池中计算上传文件的哈希值，返回原始摘要字节，需要时再由调用方转换为十六进制"""
+    return await _run_hash(_hash_stream, file.file, algorithm, max(chunk_size, MIN_UPLOAD_READ_SIZE))
+
+async def _gather_bounded(coros: List[Any], limit: int = MAX_CONCURRENT_UPLOADS) -> List[Any]:
+    """
+    并发执行协程，同一时刻最多运行 limit 个，结果按输入顺序返回。
+    单个协程抛出的异常作为结果返回，不影响其他协程。
+    """
+    semaphore = asyncio.Semaphore(max(1, min(limit, len(coros))))
+    
+    async def run(coro):
+        async with semaphore:
+            return await coro
+    
+    return await asyncio.gather(*[run(coro) for coro in coros], return_exceptions=True)
+
+def _copy_upload(source: BinaryIO, target: BinaryIO, chunk_size: int) -> int:
+    """
+    将上传文件复制到已打开的目标文件，返回写入的字节数。上传内容已溢出到磁盘时通过 os.sendfile 在内核中完成复制，
+    不经过用户态缓冲区；仍在内存中或平台不支持时按块复制。
+    """
+    # 与 Starlette 的判断方式一致：SpooledTemporaryFile 以 _rolled 标记内容是否已写入磁盘
+    if getattr(source, "_rolled", True) and hasattr(os, "sendfile"):
+        try:
+            source_fd = source.fileno()
+            size = os.fstat(source_fd).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(target.fileno(), source_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return offset
+        except (OSError, io.UnsupportedOperation):
+            target.seek(0)
+            target.truncate()
+    
+    source.seek(0)
+    shutil.copyfileobj(source, target, chunk_size)
+    return target.tell()
+
+def _persist_upload(source: BinaryIO, chunk_size: int) -> Tuple[str, int]:
+    """
+    将上传文件保存为临时文件，返回 (临时文件路径, 文件大小)。
+    临时文件由 tempfile.mkstemp 原子创建并直接使用其返回的文件描述符写入，出错时删除临时文件。
+    """
+    fd, path = tempfile.mkstemp(prefix="file_hash_upload_")
+    try:
+        with open(fd, "wb") as target:
+            return path, _copy_upload(source, target, chunk_size)
+    except BaseException:
+        os.remove(path)
+        raise
+
+async def _save_upload(file: UploadFile, chunk_size: int) -> Tuple[str, int]:
+    """在线程池中将上传文件保存为临时文件并返回 (临时文件路径, 文件大小)，避免磁盘写入阻塞事件循环"""
+    return await asyncio.to_thread(_persist_upload, file.file, max(chunk_size, MIN_UPLOAD_READ_SIZE))
+
 # API路由
 
 @app.get("/api/v1/hash", tags=["基础信息"])
@@ -185,7 +426,7 @@ async def root():
 async def hash_file(
     file: UploadFile = File(...),
     algorithm: str = Form("sha256"),
-    chunk_size: int = Form(4096)
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE)
 ):
     """
     ### 计算上传文件的哈希值
@@ -195,7 +436,7 @@ async def hash_file(
     **参数说明:**
     - **file**: 要计算哈希值的文件
     - **algorithm**: 使用的哈希算法，默认为sha256
-    - **chunk_size**: 读取文件时的块大小（字节），默认为4096
+    - **chunk_size**: 读取文件时的块大小（字节），默认为1048576（1 MiB）
     
     **返回示例:**
     ```json
@@ -208,29 +449,21 @@ async def hash_file(
     ```
     
     **可能的错误:**
-    - **400**: 不支持的哈希算法
+    - **400**: 不支持的哈希算法、chunk_size无效
     - **500**: 处理文件时出错
     """
-    if algorithm not in hashlib.algorithms_available:
+    if algorithm not in _ALGO_SET:
         raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {algorithm}")
     
+    _check_chunk_size(chunk_size)
+    
     try:
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # 创建临时文件
-        temp_file_path = f"/tmp/{uuid.uuid4()}"
-        with open(temp_file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # 流式计算哈希值
+        hash_value = (await _hash_upload(file, algorithm, chunk_size)).hex()
         
-        # 计算哈希值
-        calculator = FileHashCalculator(algorithm=algorithm, chunk_size=chunk_size)
-        hash_value = calculator.calculate(temp_file_path)
-        
-        # 删除临时文件
-        os.remove(temp_file_path)
-        
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         
         return HashResponse(
             file_name=file.filename,
@@ -241,11 +474,75 @@ async def hash_file(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理文件时出错: {str(e)}")
 
+@app.post("/api/v1/hash/stream", response_model=HashResponse, tags=["单文件处理"])
+async def hash_stream(
+    request: Request,
+    algorithm: str = "sha256",
+    file_name: str = "unknown"
+):
+    """
+    ### 计算请求体原始数据的哈希值
+    
+    直接以请求体发送文件内容（非multipart），数据在接收的同时送入哈希对象，
+    不经过上传文件的临时缓存，适合计算大文件的哈希值。
+    
+    **参数说明（查询参数）:**
+    - **algorithm**: 使用的哈希算法，默认为sha256
+    - **file_name**: 返回结果中使用的文件名，默认为unknown
+    
+    **请求示例:**
+    ```bash
+    curl -X POST --data-binary @example.txt 'http://localhost:8000/api/v1/hash/stream?algorithm=sha256&file_name=example.txt'
+    ```
+    
+    **返回示例:**
+    ```json
+    {
+        "file_name": "example.txt",
+        "algorithm": "sha256",
+        "hash_value": "a591a6d40bf420404a011733cfb7b190d62c65bf0bcda32b57b277d9ad9f146e",
+        "processing_time": 0.0234
+    }
+    ```
+    
+    **可能的错误:**
+    - **400**: 不支持的哈希算法
+    - **500**: 处理数据时出错
+    """
+    if algorithm not in _ALGO_SET:
+        raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {algorithm}")
+    
+    try:
+        start_time = time.perf_counter()
+        
+        # 请求体按网络到达的小块产出，攒够 MIN_UPLOAD_READ_SIZE 后再交给线程池计算，
+        # 哈希计算不占用事件循环，也不会为每个小块切换一次线程
+        hash_obj = new_hasher(algorithm)
+        pending = bytearray()
+        async for chunk in request.stream():
+            pending += chunk
+            if len(pending) >= MIN_UPLOAD_READ_SIZE:
+                await _run_hash(hash_obj.update, pending)
+                pending = bytearray()
+        if pending:
+            hash_obj.update(pending)
+        
+        processing_time = time.perf_counter() - start_time
+        
+        return HashResponse(
+            file_name=file_name,
+            algorithm=algorithm,
+            hash_value=hash_obj.hexdigest(),
+            processing_time=round(processing_time, 4)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"处理数据时出错: {str(e)}")
+
 @app.post("/api/v1/hash/files", response_model=BatchFileHashResponse, tags=["批量文件处理"])
 async def hash_multiple_files(
     files: List[UploadFile] = File(...),
     algorithm: str = Form("sha256"),
-    chunk_size: int = Form(4096)
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE)
 ):
     """
     ### 批量计算多个上传文件的哈希值
@@ -255,7 +552,7 @@ async def hash_multiple_files(
     **参数说明:**
     - **files**: 要计算哈希值的文件列表
     - **algorithm**: 使用的哈希算法，默认为sha256
-    - **chunk_size**: 读取文件时的块大小（字节），默认为4096
+    - **chunk_size**: 读取文件时的块大小（字节），默认为1048576（1 MiB）
     
     **返回示例:**
     ```json
@@ -282,68 +579,63 @@ async def hash_multiple_files(
     ```
     
     **可能的错误:**
-    - **400**: 不支持的哈希算法
+    - **400**: 不支持的哈希算法、chunk_size无效
     """
-    if algorithm not in hashlib.algorithms_available:
+    if algorithm not in _ALGO_SET:
         raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {algorithm}")
     
-    start_time = time.time()
-    results = []
-    success_count = 0
+    _check_chunk_size(chunk_size)
+    
+    start_time = time.perf_counter()
     error_count = 0
     
-    for file in files:
-        try:
-            file_start_time = time.time()
-            
-            # 创建临时文件
-            temp_file_path = f"/tmp/{uuid.uuid4()}"
-            with open(temp_file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            
-            # 计算哈希值
-            calculator = FileHashCalculator(algorithm=algorithm, chunk_size=chunk_size)
-            hash_value = calculator.calculate(temp_file_path)
-            
-            # 删除临时文件
-            os.remove(temp_file_path)
-            
-            file_processing_time = time.time() - file_start_time
-            
-            results.append(HashResponse(
-                file_name=file.filename,
-                algorithm=algorithm,
-                hash_value=hash_value,
-                processing_time=round(file_processing_time, 4)
-            ))
-            success_count += 1
-        except Exception as e:
+    async def process_file(file: UploadFile) -> Dict[str, Any]:
+        file_start_time = time.perf_counter()
+        
+        # 流式计算哈希值
+        hash_value = (await _hash_upload(file, algorithm, chunk_size)).hex()
+        
+        file_processing_time = time.perf_counter() - file_start_time
+        
+        return {
+            "file_name": file.filename if file.filename else "unknown",
+            "algorithm": algorithm,
+            "hash_value": hash_value,
+            "processing_time": round(file_processing_time, 4)
+        }
+    
+    # 所有文件并发计算（限制同时进行的数量），哈希计算分布在线程池的多个线程上。
+    # gather 返回的列表与文件一一对应，直接作为结果列表，只把失败的项替换为错误信息
+    results = await _gather_bounded([process_file(file) for file in files])
+    
+    for index, outcome in enumerate(results):
+        if isinstance(outcome, Exception):
             error_count += 1
-            # 添加错误信息到结果中
-            results.append(HashResponse(
-                file_name=file.filename if file.filename else "unknown",
-                algorithm=algorithm,
-                hash_value="error",
-                processing_time=0.0
-            ))
-    
-    total_processing_time = time.time() - start_time
-    
-    return BatchFileHashResponse(
-        results=results,
-        total_files=len(files),
-        success_count=success_count,
-        error_count=error_count,
-        total_processing_time=round(total_processing_time, 4)
-    )
+            results[index] = {
+                "file_name": files[index].filename if files[index].filename else "unknown",
+                "algorithm": algorithm,
+                "hash_value": "error",
+                "processing_time": 0.0
+            }
+    success_count = len(results) - error_count
+    
+    total_processing_time = time.perf_counter() - start_time
+    
+    # 结果由本函数构造，直接序列化返回，跳过 response_model 对每一项的重复校验
+    return _json_response({
+        "results": results,
+        "total_files": len(files),
+        "success_count": success_count,
+        "error_count": error_count,
+        "total_processing_time": round(total_processing_time, 4)
+    })
 
 @app.get("/api/v1/hash/algorithms", response_model=AlgorithmsResponse, tags=["基础信息"])
 async def get_algorithms():
     """
     ### 获取支持的哈希算法列表
     
-    返回系统支持的所有哈希算法列表。
+    返回系统支持的所有哈希算法列表。安装 blake3 包后列表中还会包含 blake3，推荐用于计算大文件的哈希值。
     
     **返回示例:**
     ```json
@@ -365,13 +657,13 @@ async def get_algorithms():
     }
     ```
     """
-    return AlgorithmsResponse(algorithms=sorted(list(hashlib.algorithms_available)))
+    return Response(content=_ALGORITHMS_JSON, media_type="application/json")
 
 @app.post("/api/v1/hash/path", response_model=HashResponse, tags=["服务器文件处理"])
 async def hash_file_path(
     file_path: str = Form(...),
     algorithm: str = Form("sha256"),
-    chunk_size: int = Form(4096)
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE)
 ):
     """
     ### 计算指定路径文件的哈希值
@@ -381,7 +673,7 @@ async def hash_file_path(
     **参数说明:**
     - **file_path**: 服务器上文件的完整路径
     - **algorithm**: 使用的哈希算法，默认为sha256
-    - **chunk_size**: 读取文件时的块大小（字节），默认为4096
+    - **chunk_size**: 读取文件时的块大小（字节），默认为1048576（1 MiB）
     
     **返回示例:**
     ```json
@@ -394,24 +686,31 @@ async def hash_file_path(
     ```
     
     **可能的错误:**
-    - **400**: 不支持的哈希算法
+    - **400**: 不支持的哈希算法、chunk_size无效
     - **404**: 文件不存在
     - **500**: 处理文件时出错
     """
-    if algorithm not in hashlib.algorithms_available:
+    if algorithm not in _ALGO_SET:
         raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {algorithm}")
     
-    if not os.path.isfile(file_path):
+    _check_chunk_size(chunk_size)
+    
+    # 只 stat 一次：既判断是否为普通文件，也得到文件大小供计算时选择读取方式
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        file_stat = None
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
         raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
     
     try:
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # 计算哈希值
-        calculator = FileHashCalculator(algorithm=algorithm, chunk_size=chunk_size)
-        hash_value = calculator.calculate(file_path)
+        # 在哈希计算线程池中计算哈希值，读取和计算大文件时不阻塞事件循环
+        calculator = get_calculator(algorithm, chunk_size)
+        hash_value = await _run_hash(calculator.calculate, file_path, file_stat.st_size)
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         
         return HashResponse(
             file_name=os.path.basename(file_path),
@@ -422,8 +721,167 @@ async def hash_file_path(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理文件时出错: {str(e)}")
 
-def process_directory(task_id: str, directory: str, recursive: bool, algorithm: str):
-    """后台处理目录中的文件"""
+def _file_size(file_path: str) -> int:
+    """获取文件大小，无法获取时返回0"""
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+def _timed_hash(file_path: str, algorithm: str, chunk_size: int, size: Optional[int] = None) -> Tuple[str, float]:
+    """线程池任务：计算文件哈希值并返回 (哈希值, 耗时)"""
+    start_time = time.perf_counter()
+    hash_value = calculate_file_hash(file_path, algorithm, chunk_size, size)
+    return hash_value, time.perf_counter() - start_time
+
+def _timed_hash_many(
+    file_paths: List[str], algorithm: str, chunk_size: int
+) -> List[Tuple[Optional[str], float, Optional[Exception]]]:
+    """线程池任务：依次计算一组小文件的哈希值（共用读取缓冲区），返回 [(哈希值, 耗时, 异常)]"""
+    outcomes = []
+    start_time = time.perf_counter()
+    for hash_value, error in get_calculator(algorithm, chunk_size).calculate_many(file_paths):
+        end_time = time.perf_counter()
+        outcomes.append((hash_value, end_time - start_time, error))
+        start_time = end_time
+    return outcomes
+
+def _collect_files(directory: str, recursive: bool) -> List[Tuple[str, Optional[os.stat_result]]]:
+    """
+    使用 os.scandir 收集目录中的文件及其状态信息，返回 (文件路径, stat结果) 列表。
+    
+    DirEntry 缓存了目录项的类型，判断文件或目录不需要额外的 stat 调用；每个文件只 stat 一次，
+    后续的缓存查询和调度直接复用该结果。递归时不进入指向目录的符号链接（与 os.walk 默认行为一致）。
+    """
+    files = []
+    directories = [directory]
+    while directories:
+        current = directories.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            # 与 os.walk 一致，跳过无法读取的子目录
+            if current == directory:
+                raise
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_file():
+                    try:
+                        files.append((entry.path, entry.stat()))
+                    except OSError:
+                        files.append((entry.path, None))
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+    return files
+
+def _schedule_hashes(
+    file_paths: List[str], algorithm: str, chunk_size: int = DEFAULT_CHUNK_SIZE, sizes: Optional[List[int]] = None
+) -> Iterator[Tuple[int, Optional[str], float, Optional[Exception]]]:
+    """
+    按文件大小调度一批文件的哈希计算，按完成顺序逐个产出 (索引, 哈希值, 耗时, 异常)。
+    
+    大文件按大小降序逐个提交到线程池，使各线程负载更均衡；小于 SMALL_FILE_THRESHOLD 的文件
+    每 SMALL_FILE_BATCH_SIZE 个合成一个任务，避免任务调度的开销超过哈希计算本身，
+    同时让大量小文件也能分布到多个线程上并行计算。已知文件大小时可通过 sizes 传入，避免重复 stat。
+    """
+    if sizes is None:
+        sizes = [_file_size(file_path) for file_path in file_paths]
+    large_files = sorted(
+        (index for index, size in enumerate(sizes) if size >= SMALL_FILE_THRESHOLD),
+        key=sizes.__getitem__,
+        reverse=True
+    )
+    futures = {
+        _POOL.submit(_timed_hash, file_paths[index], algorithm, chunk_size, sizes[index]): index
+        for index in large_files
+    }
+    
+    small_files = [index for index, size in enumerate(sizes) if size < SMALL_FILE_THRESHOLD]
+    small_batches = {}
+    for offset in range(0, len(small_files), SMALL_FILE_BATCH_SIZE):
+        batch = small_files[offset:offset + SMALL_FILE_BATCH_SIZE]
+        future = _POOL.submit(_timed_hash_many, [file_paths[index] for index in batch], algorithm, chunk_size)
+        small_batches[future] = batch
+    
+    for future in as_completed([*futures, *small_batches]):
+        if future in small_batches:
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                # 整组失败（如创建计算器出错）时，与大文件一致地记为组内每个文件的错误
+                outcomes = [(None, 0.0, e)] * len(small_batches[future])
+            for index, (hash_value, elapsed, error) in zip(small_batches[future], outcomes):
+                yield index, hash_value, elapsed, error
+            continue
+        try:
+            hash_value, elapsed = future.result()
+            yield futures[future], hash_value, elapsed, None
+        except Exception as e:
+            yield futures[future], None, 0.0, e
+
+def _store_results(task: Dict[str, Any], content: Dict[str, Any]):
+    """
+    序列化已完成任务的结果并写入临时文件，任务中只保留文件路径，大批量任务的结果不再常驻内存。
+    临时文件无法写入时退回为在内存中保存序列化后的结果。
+    """
+    data = _dump_json(content)
+    try:
+        fd, path = tempfile.mkstemp(prefix="file_hash_results_", suffix=".json")
+    except OSError:
+        task["_results_json"] = data
+        return
+    try:
+        with open(fd, "wb") as file:
+            file.write(data)
+    except OSError:
+        os.remove(path)
+        task["_results_json"] = data
+        return
+    task["_results_path"] = path
+    # 任务在计算期间已被删除（如应用退出时清空存储），不会再有人删除该文件，在这里删除。
+    # 先记录路径再检查标记，与 _discard_results 的顺序相反，两者并发时至少有一方会删除文件
+    if task.get("_evicted"):
+        _discard_results(content["task_id"], task)
+
+def _results_response(task_id: str, task: Dict[str, Any]) -> Response:
+    """返回已完成任务的结果：结果保存在磁盘上时直接以文件形式发送"""
+    results_path = task.get("_results_path")
+    if results_path is not None:
+        return FileResponse(results_path, media_type="application/json")
+    if "_results_json" in task:
+        return Response(content=task["_results_json"], media_type="application/json")
+    raise HTTPException(status_code=500, detail=f"任务结果不可用: {task_id}")
+
+def _batch_status(task_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+    """构造目录批处理任务的状态信息（与 BatchTaskStatus 字段一致）"""
+    return {
+        "task_id": task_id,
+        "status": task["status"],
+        "directory": task["directory"],
+        "created_at": task["created_at"],
+        "completed_at": task.get("completed_at"),
+        "total_files": task.get("total_files"),
+        "processed_files": task.get("processed_files"),
+        "success_count": task.get("success_count"),
+        "error_count": task.get("error_count")
+    }
+
+def _upload_batch_status(task_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+    """构造上传文件批处理任务的状态信息（与 AsyncUploadHashStatus 字段一致）"""
+    return {
+        "task_id": task_id,
+        "status": task["status"],
+        "created_at": task["created_at"],
+        "file_count": task["file_count"],
+        "completed_at": task.get("completed_at"),
+        "processed_files": task.get("processed_files"),
+        "success_count": task.get("success_count"),
+        "error_count": task.get("error_count")
+    }
+
+def process_directory(task_id: str, directory: str, recursive: bool, algorithm: str, use_cache: bool = True):
+    """后台处理目录中的文件，文件未变化时直接使用哈希缓存中的结果"""
     task = batch_tasks[task_id]
     task["status"] = "processing"
     
@@ -432,55 +890,110 @@ def process_directory(task_id: str, directory: str, recursive: bool, algorithm:
     error_count = 0
     
     try:
-        files_to_process = []
-        
         # 收集要处理的文件
-        if recursive:
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    files_to_process.append(os.path.join(root, file))
-        else:
-            for file in os.listdir(directory):
-                file_path = os.path.join(directory, file)
-                if os.path.isfile(file_path):
-                    files_to_process.append(file_path)
+        collected = _collect_files(directory, recursive)
+        files_to_process = [file_path for file_path, _ in collected]
+        file_stats = [file_stat for _, file_stat in collected]
         
         task["total_files"] = len(files_to_process)
         task["processed_files"] = 0
+        results = [None] * len(files_to_process)
+        cache = hash_cache if use_cache else None
+        cache_hits = []
         
-        # 处理每个文件
-        calculator = FileHashCalculator(algorithm=algorithm)
-        for file_path in files_to_process:
-            try:
-                hash_value = calculator.calculate(file_path)
-                results.append(FileHashResult(
-                    file_path=file_path,
-                    algorithm=algorithm,
-                    hash_value=hash_value,
-                    status="success"
-                ))
+        # 先查询哈希缓存，只有未命中的文件需要计算
+        if cache is None:
+            pending = list(range(len(files_to_process)))
+        else:
+            pending = []
+            for index, (file_path, file_stat) in enumerate(collected):
+                hash_value = None
+                if file_stat is not None:
+                    try:
+                        hash_value = cache.get(file_path, algorithm, file_stat.st_size, file_stat.st_mtime_ns)
+                    except sqlite3.Error:
+                        pass
+                
+                if hash_value is None:
+                    pending.append(index)
+                    continue
+                
+                cache_hits.append((file_path, algorithm))
+                results[index] = {
+                    "file_path": file_path,
+                    "algorithm": algorithm,
+                    "hash_value": hash_value,
+                    "status": "success",
+                    "error_message": None
+                }
                 success_count += 1
-            except Exception as e:
-                results.append(FileHashResult(
-                    file_path=file_path,
-                    algorithm=algorithm,
-                    status="error",
-                    error_message=str(e)
-                ))
+            task["processed_files"] = success_count
+        
+        # 按完成顺序收集结果，结果列表保持原有的文件顺序；新计算的哈希值最后一次性写入缓存
+        cache_entries = []
+        pending_paths = [files_to_process[index] for index in pending]
+        pending_sizes = [file_stats[index].st_size if file_stats[index] is not None else 0 for index in pending]
+        for position, hash_value, _, error in _schedule_hashes(pending_paths, algorithm, sizes=pending_sizes):
+            index = pending[position]
+            file_path = pending_paths[position]
+            if error is None:
+                results[index] = {
+                    "file_path": file_path,
+                    "algorithm": algorithm,
+                    "hash_value": hash_value,
+                    "status": "success",
+                    "error_message": None
+                }
+                success_count += 1
+                
+                # 使用计算前获取的文件状态写入缓存，计算期间文件被修改时下次会重新计算
+                file_stat = file_stats[index]
+                if cache is not None and file_stat is not None:
+                    cache_entries.append((file_path, algorithm, file_stat.st_size, file_stat.st_mtime_ns, hash_value))
+            else:
+                results[index] = {
+                    "file_path": file_path,
+                    "algorithm": algorithm,
+                    "hash_value": None,
+                    "status": "error",
+                    "error_message": str(error)
+                }
                 error_count += 1
             
             task["processed_files"] += 1
         
-        # 更新任务状态
-        task["status"] = "completed"
+        # 命中记录的访问时间和新计算的哈希值各在一个事务中写入
+        if cache_hits:
+            try:
+                cache.touch_many(cache_hits)
+            except sqlite3.Error:
+                pass
+        if cache_entries:
+            try:
+                cache.set_many(cache_entries)
+            except sqlite3.Error:
+                pass
+        
+        # 更新任务状态。任务完成后状态和结果不再变化，预先序列化，查询时直接返回；
+        # 结果先于状态写入，查询到 completed 状态时结果一定可用
         task["completed_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
         task["success_count"] = success_count
         task["error_count"] = error_count
-        task["results"] = results
+        _store_results(task, {
+            "task_id": task_id,
+            "directory": directory,
+            "results": results
+        })
+        task["status"] = "completed"
+        task["_status_json"] = _dump_json(_batch_status(task_id, task))
         
     except Exception as e:
         task["status"] = "failed"
         task["error"] = str(e)
+        task["_status_json"] = _dump_json(_batch_status(task_id, task))
+    
+    # 运行期间任务不会过期，完成后从现在开始计算过期时间
+    batch_tasks.touch(task_id)
 
 @app.post("/api/v1/hash/batch", response_model=BatchTaskResponse, tags=["异步处理", "服务器文件处理"])
 async def batch_hash_files(request: BatchTaskRequest, background_tasks: BackgroundTasks):
@@ -493,6 +1006,7 @@ async def batch_hash_files(request: BatchTaskRequest, background_tasks: Backgrou
     - **directory**: 服务器上的目录路径
     - **recursive**: 是否递归处理子目录，默认为false
     - **algorithm**: 使用的哈希算法，默认为sha256
+    - **use_cache**: 是否使用哈希缓存，默认为true。文件大小和修改时间均未变化时直接返回缓存的哈希值，不再读取文件
     
     **返回示例:**
     ```json
@@ -505,6 +1019,7 @@ async def batch_hash_files(request: BatchTaskRequest, background_tasks: Backgrou
     ```
     
     **可能的错误:**
+    - **400**: 不支持的哈希算法
     - **404**: 目录不存在
     
     **使用流程:**
@@ -512,6 +1027,9 @@ async def batch_hash_files(request: BatchTaskRequest, background_tasks: Backgrou
     2. 使用返回的task_id查询任务状态
     3. 当任务完成后，获取任务结果
     """
+    if request.algorithm not in _ALGO_SET:
+        raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {request.algorithm}")
+    
     if not os.path.isdir(request.directory):
         raise HTTPException(status_code=404, detail=f"目录不存在: {request.directory}")
     
@@ -524,7 +1042,8 @@ async def batch_hash_files(request: BatchTaskRequest, background_tasks: Backgrou
         "directory": request.directory,
         "created_at": created_at,
         "algorithm": request.algorithm,
-        "recursive": request.recursive
+        "recursive": request.recursive,
+        "use_cache": request.use_cache
     }
     
     batch_tasks[task_id] = task
@@ -535,7 +1054,8 @@ async def batch_hash_files(request: BatchTaskRequest, background_tasks: Backgrou
         task_id,
         request.directory,
         request.recursive,
-        request.algorithm
+        request.algorithm,
+        request.use_cache
     )
     
     return BatchTaskResponse(
@@ -573,22 +1093,15 @@ async def get_batch_status(task_id: str):
     **可能的错误:**
     - **404**: 任务未找到
     """
-    if task_id not in batch_tasks:
+    task = batch_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"任务未找到: {task_id}")
     
-    task = batch_tasks[task_id]
+    status_json = task.get("_status_json")
+    if status_json is not None:
+        return Response(content=status_json, media_type="application/json")
     
-    return BatchTaskStatus(
-        task_id=task_id,
-        status=task["status"],
-        directory=task["directory"],
-        created_at=task["created_at"],
-        completed_at=task.get("completed_at"),
-        total_files=task.get("total_files"),
-        processed_files=task.get("processed_files"),
-        success_count=task.get("success_count"),
-        error_count=task.get("error_count")
-    )
+    return _json_response(_batch_status(task_id, task))
 
 @app.get("/api/v1/hash/batch/{task_id}/results", response_model=BatchTaskResults, tags=["异步处理", "服务器文件处理"])
 async def get_batch_results(task_id: str):
@@ -629,88 +1142,104 @@ async def get_batch_results(task_id: str):
     - **400**: 任务尚未完成
     - **500**: 任务结果不可用
     """
-    if task_id not in batch_tasks:
+    task = batch_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"任务未找到: {task_id}")
     
-    task = batch_tasks[task_id]
-    
     if task["status"] not in ["completed", "failed"]:
         raise HTTPException(status_code=400, detail=f"任务尚未完成: {task_id}")
     
-    if "results" not in task:
-        raise HTTPException(status_code=500, detail=f"任务结果不可用: {task_id}")
-    
-    return BatchTaskResults(
-        task_id=task_id,
-        directory=task["directory"],
-        results=task["results"]
-    )
+    return _results_response(task_id, task)
 
-async def process_uploaded_files(task_id: str, files_data: List[Dict], algorithm: str, chunk_size: int):
-    """异步处理上传的文件批量计算哈希值"""
+def process_uploaded_files(task_id: str, files_data: List[Dict], algorithm: str, chunk_size: int):
+    """后台处理上传的文件批量计算哈希值（等待线程池结果，因此以同步函数在线程池中运行）"""
     task = upload_batch_tasks[task_id]
     task["status"] = "processing"
     
-    results = []
+    results = [None] * len(files_data)
     success_count = 0
     error_count = 0
-    start_time = time.time()
+    start_time = time.perf_counter()
+    # 尚未删除的临时文件索引，任务异常中断时在 finally 中统一清理
+    remaining = set(range(len(files_data)))
     
     try:
-        calculator = FileHashCalculator(algorithm=algorithm, chunk_size=chunk_size)
         task["processed_files"] = 0
+        file_paths = [file_data["path"] for file_data in files_data]
+        # 保存上传文件时已得到文件大小，调度和计算时不再 stat；与其他上传接口一样按不小于 MIN_UPLOAD_READ_SIZE 的块读取
+        sizes = [file_data["size"] for file_data in files_data]
+        read_size = max(chunk_size, MIN_UPLOAD_READ_SIZE)
         
-        for file_data in files_data:
-            file_start_time = time.time()
-            try:
-                # 计算哈希值
-                hash_value = calculator.calculate(file_data["path"])
-                
-                results.append(FileUploadHashResult(
-                    file_name=file_data["name"],
-                    algorithm=algorithm,
-                    hash_value=hash_value,
-                    status="success",
-                    processing_time=round(time.time() - file_start_time, 4)
-                ))
+        for index, hash_value, elapsed, error in _schedule_hashes(file_paths, algorithm, read_size, sizes):
+            file_data = files_data[index]
+            if error is None:
+                results[index] = {
+                    "file_name": file_data["name"],
+                    "algorithm": algorithm,
+                    "hash_value": hash_value,
+                    "status": "success",
+                    "error_message": None,
+                    "processing_time": round(elapsed, 4)
+                }
                 success_count += 1
-            except Exception as e:
-                results.append(FileUploadHashResult(
-                    file_name=file_data["name"],
-                    algorithm=algorithm,
-                    status="error",
-                    error_message=str(e),
-                    processing_time=round(time.time() - file_start_time, 4)
-                ))
+            else:
+                results[index] = {
+                    "file_name": file_data["name"],
+                    "algorithm": algorithm,
+                    "hash_value": None,
+                    "status": "error",
+                    "error_message": str(error),
+                    "processing_time": round(elapsed, 4)
+                }
                 error_count += 1
             
-            # 删除临时文件
+            # 每个文件计算完成后立即删除其临时文件，线程池同时继续计算其他文件
             try:
                 os.remove(file_data["path"])
             except:
                 pass
+            remaining.discard(index)
                 
             task["processed_files"] += 1
         
-        total_processing_time = time.time() - start_time
+        total_processing_time = time.perf_counter() - start_time
         
-        # 更新任务状态
-        task["status"] = "completed"
+        # 更新任务状态。任务完成后状态和结果不再变化，预先序列化，查询时直接返回；
+        # 结果先于状态写入，查询到 completed 状态时结果一定可用
         task["completed_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
         task["success_count"] = success_count
         task["error_count"] = error_count
-        task["results"] = results
         task["total_processing_time"] = round(total_processing_time, 4)
+        _store_results(task, {
+            "task_id": task_id,
+            "results": results,
+            "total_files": task["file_count"],
+            "success_count": success_count,
+            "error_count": error_count,
+            "total_processing_time": task["total_processing_time"]
+        })
+        task["status"] = "completed"
+        task["_status_json"] = _dump_json(_upload_batch_status(task_id, task))
         
     except Exception as e:
         task["status"] = "failed"
         task["error"] = str(e)
+        task["_status_json"] = _dump_json(_upload_batch_status(task_id, task))
+    finally:
+        for index in remaining:
+            try:
+                os.remove(files_data[index]["path"])
+            except OSError:
+                pass
+        
+        # 运行期间任务不会过期，完成后从现在开始计算过期时间
+        upload_batch_tasks.touch(task_id)
 
 @app.post("/api/v1/hash/upload/batch", response_model=AsyncUploadHashResponse, tags=["异步处理", "批量文件处理"])
 async def batch_hash_uploaded_files(
     files: List[UploadFile] = File(...),
     algorithm: str = Form("sha256"),
-    chunk_size: int = Form(4096),
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE),
     background_tasks: BackgroundTasks = BackgroundTasks()
 ):
     """
@@ -721,7 +1250,7 @@ async def batch_hash_uploaded_files(
     **参数说明:**
     - **files**: 要计算哈希值的文件列表
     - **algorithm**: 使用的哈希算法，默认为sha256
-    - **chunk_size**: 读取文件时的块大小（字节），默认为4096
+    - **chunk_size**: 读取文件时的块大小（字节），默认为1048576（1 MiB）
     
     **返回示例:**
     ```json
@@ -734,31 +1263,39 @@ async def batch_hash_uploaded_files(
     ```
     
     **可能的错误:**
-    - **400**: 不支持的哈希算法
+    - **400**: 不支持的哈希算法、chunk_size无效
     
     **使用流程:**
     1. 调用此API上传文件并创建批处理任务
     2. 使用返回的task_id查询任务状态
     3. 当任务完成后，获取任务结果
     """
-    if algorithm not in hashlib.algorithms_available:
+    if algorithm not in _ALGO_SET:
         raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {algorithm}")
     
+    _check_chunk_size(chunk_size)
+    
     task_id = str(uuid.uuid4())
     created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
     
-    # 保存上传的文件到临时位置
+    # 保存上传的文件到临时位置；中途失败或请求被取消时删除已保存的临时文件
     files_data = []
-    for file in files:
-        temp_file_path = f"/tmp/{uuid.uuid4()}"
-        with open(temp_file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        files_data.append({
-            "name": file.filename,
-            "path": temp_file_path
-        })
+    try:
+        for file in files:
+            temp_file_path, size = await _save_upload(file, chunk_size)
+            
+            files_data.append({
+                "name": file.filename,
+                "path": temp_file_path,
+                "size": size
+            })
+    except BaseException:
+        for file_data in files_data:
+            try:
+                os.remove(file_data["path"])
+            except OSError:
+                pass
+        raise
     
     task = {
         "task_id": task_id,
@@ -814,21 +1351,15 @@ async def get_upload_batch_status(task_id: str):
     **可能的错误:**
     - **404**: 任务未找到
     """
-    if task_id not in upload_batch_tasks:
+    task = upload_batch_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"任务未找到: {task_id}")
     
-    task = upload_batch_tasks[task_id]
+    status_json = task.get("_status_json")
+    if status_json is not None:
+        return Response(content=status_json, media_type="application/json")
     
-    return AsyncUploadHashStatus(
-        task_id=task_id,
-        status=task["status"],
-        created_at=task["created_at"],
-        file_count=task["file_count"],
-        completed_at=task.get("completed_at"),
-        processed_files=task.get("processed_files"),
-        success_count=task.get("success_count"),
-        error_count=task.get("error_count")
-    )
+    return _json_response(_upload_batch_status(task_id, task))
 
 @app.get("/api/v1/hash/upload/batch/{task_id}/results", response_model=AsyncUploadHashResults, tags=["异步处理", "批量文件处理"])
 async def get_upload_batch_results(task_id: str):
@@ -874,32 +1405,21 @@ async def get_upload_batch_results(task_id: str):
     - **400**: 任务尚未完成
     - **500**: 任务结果不可用
     """
-    if task_id not in upload_batch_tasks:
+    task = upload_batch_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"任务未找到: {task_id}")
     
-    task = upload_batch_tasks[task_id]
-    
     if task["status"] not in ["completed", "failed"]:
         raise HTTPException(status_code=400, detail=f"任务尚未完成: {task_id}")
     
-    if "results" not in task:
-        raise HTTPException(status_code=500, detail=f"任务结果不可用: {task_id}")
-    
-    return AsyncUploadHashResults(
-        task_id=task_id,
-        results=task["results"],
-        total_files=task["file_count"],
-        success_count=task.get("success_count", 0),
-        error_count=task.get("error_count", 0),
-        total_processing_time=task.get("total_processing_time", 0)
-    )
+    return _results_response(task_id, task)
 
 @app.post("/api/v1/hash/verify", response_model=BatchVerifyResponse, tags=["哈希验证", "批量文件处理"])
 async def verify_file_hashes(
     files: List[UploadFile] = File(...),
     expected_hashes: str = Form(...),  # JSON格式的期望哈希值列表
     algorithm: str = Form("sha256"),
-    chunk_size: int = Form(4096)
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE)
 ):
     """
     ### 验证上传文件的哈希值是否与期望值匹配
@@ -910,7 +1430,7 @@ async def verify_file_hashes(
     - **files**: 要验证的文件列表
     - **expected_hashes**: JSON格式的期望哈希值列表，格式为: `[{"file_name": "example.txt", "expected_hash": "1234..."}]`
     - **algorithm**: 使用的哈希算法，默认为sha256
-    - **chunk_size**: 读取文件时的块大小（字节），默认为4096
+    - **chunk_size**: 读取文件时的块大小（字节），默认为1048576（1 MiB）
     
     **示例请求:**
     
@@ -957,88 +1477,88 @@ async def verify_file_hashes(
     ```
     
     **可能的错误:**
-    - **400**: 不支持的哈希算法、expected_hashes格式错误
+    - **400**: 不支持的哈希算法、chunk_size无效、expected_hashes格式错误
     - **500**: 验证文件哈希值时出错
     """
-    if algorithm not in hashlib.algorithms_available:
+    if algorithm not in _ALGO_SET:
         raise HTTPException(status_code=400, detail=f"不支持的哈希算法: {algorithm}")
     
+    _check_chunk_size(chunk_size)
+    
     try:
         # 解析期望的哈希值
-        hash_expectations = {}
         try:
-            expected_hash_list = json.loads(expected_hashes)
-            for item in expected_hash_list:
-                hash_expectations[item["file_name"]] = item["expected_hash"]
+            expected_hash_list = _json_loads(expected_hashes)
+            hash_expectations = {item["file_name"]: item["expected_hash"] for item in expected_hash_list}
+            # 期望值必须是字符串，在解析时一次性检查，避免逐个文件构造结果时才出错
+            if not all(isinstance(expected_hash, str) for expected_hash in hash_expectations.values()):
+                raise TypeError("expected_hash必须是字符串")
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="expected_hashes参数必须是有效的JSON格式")
-        except KeyError:
+        except (KeyError, TypeError):
             raise HTTPException(status_code=400, detail="expected_hashes格式错误，必须包含file_name和expected_hash字段")
         
-        start_time = time.time()
-        results = []
+        # 预先将期望的哈希值解码为字节（解码时不区分大小写），每个文件只需解码实际的哈希值
+        expected_digests = {file_name: _parse_hex(expected_hash) for file_name, expected_hash in hash_expectations.items()}
+        
+        start_time = time.perf_counter()
         match_count = 0
         mismatch_count = 0
         
-        for file in files:
-            if file.filename not in hash_expectations:
-                continue
-                
-            try:
-                file_start_time = time.time()
-                
-                # 创建临时文件
-                temp_file_path = f"/tmp/{uuid.uuid4()}"
-                with open(temp_file_path, "wb") as f:
-                    content = await file.read()
-                    f.write(content)
-                
-                # 计算哈希值
-                calculator = FileHashCalculator(algorithm=algorithm, chunk_size=chunk_size)
-                actual_hash = calculator.calculate(temp_file_path)
-                
-                # 删除临时文件
-                os.remove(temp_file_path)
-                
-                # 验证哈希值
-                expected_hash = hash_expectations[file.filename]
-                matched = expected_hash.lower() == actual_hash.lower()
-                
-                if matched:
-                    match_count += 1
-                else:
-                    mismatch_count += 1
-                    
-                file_processing_time = time.time() - file_start_time
-                
-                results.append(FileHashVerifyResult(
-                    file_name=file.filename,
-                    expected_hash=expected_hash,
-                    actual_hash=actual_hash,
-                    matched=matched,
-                    algorithm=algorithm,
-                    processing_time=round(file_processing_time, 4)
-                ))
-            except Exception as e:
+        async def verify_file(file: UploadFile) -> Dict[str, Any]:
+            file_start_time = time.perf_counter()
+            
+            # 流式计算哈希值
+            actual_digest = await _hash_upload(file, algorithm, chunk_size)
+            
+            # 验证哈希值：直接比较摘要字节，只在写入结果时转换一次十六进制
+            expected_digest = expected_digests[file.filename]
+            matched = expected_digest is not None and hmac.compare_digest(expected_digest, actual_digest)
+            
+            file_processing_time = time.perf_counter() - file_start_time
+            
+            return {
+                "file_name": file.filename,
+                "expected_hash": hash_expectations[file.filename],
+                "actual_hash": actual_digest.hex(),
+                "matched": matched,
+                "algorithm": algorithm,
+                "processing_time": round(file_processing_time, 4)
+            }
+        
+        # 只验证提供了期望值的文件，并发计算（限制同时进行的数量），结果保持上传顺序。
+        # gather 返回的列表直接作为结果列表，只把失败的项替换为错误信息
+        wanted_files = [file for file in files if file.filename in hash_expectations]
+        results = await _gather_bounded([verify_file(file) for file in wanted_files])
+        
+        for index, outcome in enumerate(results):
+            if isinstance(outcome, Exception):
                 mismatch_count += 1
                 # 添加错误信息到结果中
-                results.append(FileHashVerifyResult(
-                    file_name=file.filename,
-                    expected_hash=hash_expectations[file.filename],
-                    actual_hash="error",
-                    matched=False,
-                    algorithm=algorithm,
-                    processing_time=0.0
-                ))
+                results[index] = {
+                    "file_name": wanted_files[index].filename,
+                    "expected_hash": hash_expectations[wanted_files[index].filename],
+                    "actual_hash": "error",
+                    "matched": False,
+                    "algorithm": algorithm,
+                    "processing_time": 0.0
+                }
+            elif outcome["matched"]:
+                match_count += 1
+            else:
+                mismatch_count += 1
         
-        total_processing_time = time.time() - start_time
+        total_processing_time = time.perf_counter() - start_time
         
-        return BatchVerifyResponse(
-            results=results,
-            total_files=len(results),
-            match_count=match_count,
-            mismatch_count=mismatch_count,
-            total_processing_time=round(total_processing_time, 4)
-        )
+        # 结果由本函数构造，直接序列化返回，跳过 response_model 对每一项的重复校验
+        return _json_response({
+            "results": results,
+            "total_files": len(results),
+            "match_count": match_count,
+            "mismatch_count": mismatch_count,
+            "total_processing_time": round(total_processing_time, 4)
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"验证文件哈希值时出错: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+异步任务存储
+---------------
+有容量上限和过期时间的任务信息存储，避免已完成任务的结果无限占用内存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 尚未完成的任务状态，处于这些状态的任务不会因过期或容量限制被删除
+UNFINISHED_STATUSES = frozenset({"pending", "processing"})
+
+def _evictable(task: Dict[str, Any]) -> bool:
+    return task.get("status") not in UNFINISHED_STATUSES
+
+class TaskStore:
+    """
+    按 task_id 保存任务信息的线程安全存储。
+
+    - 每次写入或读取任务都会刷新它的过期时间，超过 ttl 秒未被访问的任务自动删除
+    - 任务数超过 maxsize 时淘汰最久未访问的任务
+    - 尚未完成（status 为 pending 或 processing）的任务不会被删除，完成时应调用 touch() 重新开始计算过期时间
+    - 任务因过期、淘汰或 clear() 被删除后调用 on_evict(task_id, task)，用于释放任务占用的外部资源
+
+    支持 `task_id in store`、`store[task_id]` 和 `store[task_id] = task` 操作。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 3600,
+        on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        # 按最近访问顺序排列，由于每次访问都刷新过期时间，该顺序同时也是过期时间顺序
+        self._tasks: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __setitem__(self, task_id: str, task: Dict[str, Any]):
+        with self._lock:
+            self._tasks[task_id] = (time.monotonic() + self.ttl, task)
+            self._tasks.move_to_end(task_id)
+            evicted = self._expire()
+            if len(self._tasks) > self.maxsize:
+                # 按最久未访问的顺序淘汰已完成的任务，全部未完成时允许暂时超出容量
+                candidates = [
+                    (candidate_id, candidate)
+                    for candidate_id, (_, candidate) in self._tasks.items()
+                    if _evictable(candidate)
+                ]
+                for evicted_id, evicted_task in candidates[:len(self._tasks) - self.maxsize]:
+                    del self._tasks[evicted_id]
+                    evicted.append((evicted_id, evicted_task))
+        self._notify(evicted)
+
+    def get(self, task_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            evicted = self._expire()
+            item = self._tasks.get(task_id)
+            if item is not None:
+                self._tasks[task_id] = (time.monotonic() + self.ttl, item[1])
+                self._tasks.move_to_end(task_id)
+        self._notify(evicted)
+        return default if item is None else item[1]
+
+    def touch(self, task_id: str):
+        """刷新任务的过期时间（任务不存在时忽略），用于任务完成时重新开始计算过期时间"""
+        self.get(task_id)
+
+    def __getitem__(self, task_id: str) -> Dict[str, Any]:
+        task = self.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            evicted = self._expire()
+            count = len(self._tasks)
+        self._notify(evicted)
+        return count
+
+    def clear(self):
+        """删除全部任务"""
+        with self._lock:
+            evicted = [(task_id, task) for task_id, (_, task) in self._tasks.items()]
+            self._tasks.clear()
+        self._notify(evicted)
+
+    def _expire(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        删除已过期的任务并返回被删除的 (task_id, task) 列表（调用方需持有锁）。
+        已过期但尚未完成的任务刷新过期时间后移到末尾，每个任务最多检查一次。
+        """
+        evicted = []
+        now = time.monotonic()
+        for _ in range(len(self._tasks)):
+            task_id, (expires_at, task) = next(iter(self._tasks.items()))
+            if expires_at > now:
+                break
+            if _evictable(task):
+                del self._tasks[task_id]
+                evicted.append((task_id, task))
+            else:
+                self._tasks[task_id] = (now + self.ttl, task)
+                self._tasks.move_to_end(task_id)
+        return evicted
+
+    def _notify(self, evicted: List[Tuple[str, Dict[str, Any]]]):
+        """在锁外对被删除的任务调用 on_evict，回调中的耗时操作不会阻塞其他线程访问存储"""
+        if self.on_evict is None:
+            return
+        for task_id, task in evicted:
+            self.on_evict(task_id, task)
@@ -3,59 +3,285 @@
 FileHashDirect 模块
 ---------------------
 提供直接计算文件哈希值的功能，支持 Python 3.11.5 环境下的多种哈希算法和分块读取方式。
+安装 blake3 包后额外支持 'blake3' 算法，适合计算大文件的哈希值。
 """
 
 import hashlib
+import mmap
 import os
 import argparse
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    import blake3
+except ImportError:  # blake3 为可选依赖，未安装时不提供该算法
+    blake3 = None
+
+# 默认读取块大小（字节）：1 MiB 可以放进 L2 缓存，同时大幅减少 read 调用次数
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# 超过该大小（字节）的文件通过 mmap 读取
+MMAP_THRESHOLD = 8 << 20
+
+# 超过该大小（字节）的文件在计算过程中逐步释放已读过部分的页缓存，避免单个超大文件挤掉其他文件的缓存
+DROP_CACHE_THRESHOLD = 1 << 30
+
+# 释放页缓存的粒度（字节）
+DROP_CACHE_INTERVAL = 64 << 20
+
+# mmap 读取时提示内核预读的窗口大小（字节），与块大小无关
+PREFETCH_WINDOW = 8 << 20
+
+# 常用算法直接使用 hashlib 的具名构造函数：它们走 OpenSSL EVP 路径，
+# 可以启用 SHA-NI 等硬件加速；其他算法回退到 hashlib.new
+_HASH_CONSTRUCTORS = {
+    'md5': hashlib.md5,
+    'sha1': hashlib.sha1,
+    'sha224': hashlib.sha224,
+    'sha256': hashlib.sha256,
+    'sha384': hashlib.sha384,
+    'sha512': hashlib.sha512,
+}
+
+# 支持的哈希算法：hashlib 提供的全部算法，以及已安装 blake3 包时的 'blake3'
+SUPPORTED_ALGORITHMS = frozenset(hashlib.algorithms_available | ({'blake3'} if blake3 is not None else set()))
+
+@lru_cache(maxsize=32)
+def _hash_template(algorithm: str):
+    """创建并缓存指定算法处于初始状态的哈希对象，仅用于复制，不能直接 update"""
+    if algorithm == 'blake3' and blake3 is not None:
+        return blake3.blake3()
+    constructor = _HASH_CONSTRUCTORS.get(algorithm)
+    if constructor is not None:
+        return constructor()
+    return hashlib.new(algorithm)
+
+def new_hasher(algorithm: str):
+    """
+    创建指定算法的哈希对象。对象从缓存的初始状态复制得到，
+    比每次重新查找算法并初始化上下文更快。
+
+    参数:
+      - algorithm (str): 哈希算法名称（小写）
+
+    返回:
+      - 哈希对象，支持 update/hexdigest 等方法
+    """
+    return _hash_template(algorithm).copy()
+
+def _advise_sequential(fd: int):
+    """提示内核将按顺序读取文件，使其更积极地预读（仅在支持 posix_fadvise 的平台上生效）"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+def _drop_cache(fd: int, offset: int, length: int):
+    """通过 POSIX_FADV_DONTNEED 让内核释放文件 [offset, offset + length) 的页缓存（仅在支持的平台上生效）"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+def _unmap_range(mapped: mmap.mmap, offset: int, length: int):
+    """通过 MADV_DONTNEED 解除映射中 [offset, offset + length) 对页缓存的引用"""
+    if hasattr(mmap, 'MADV_DONTNEED'):
+        start = offset - offset % mmap.PAGESIZE
+        try:
+            mapped.madvise(mmap.MADV_DONTNEED, start, length + offset - start)
+        except OSError:
+            pass
+
+def _prefetch(mapped: mmap.mmap, offset: int, length: int):
+    """通过 MADV_WILLNEED 让内核异步读入映射中 [offset, offset + length) 的内容"""
+    if not hasattr(mmap, 'MADV_WILLNEED'):
+        return
+    start = offset - offset % mmap.PAGESIZE
+    if start >= len(mapped):
+        return
+    try:
+        mapped.madvise(mmap.MADV_WILLNEED, start, min(length + offset - start, len(mapped) - start))
+    except OSError:
+        pass
 
 class FileHashCalculator:
-    def __init__(self, algorithm: str = 'sha256', chunk_size: int = 4096):
+    def __init__(self, algorithm: str = 'sha256', chunk_size: int = DEFAULT_CHUNK_SIZE):
         """
         初始化 FileHashCalculator 实例
 
         参数:
           - algorithm (str): 哈希算法，默认 'sha256'
-          - chunk_size (int): 每次读取的块大小（字节），默认 4096
+          - chunk_size (int): 每次读取的块大小（字节），默认 1048576（1 MiB）
+
+        异常:
+          - ValueError: 当使用的算法不受支持或块大小不是正整数时
         """
         self.algorithm = algorithm.lower()
         self.chunk_size = chunk_size
-        if self.algorithm not in hashlib.algorithms_available:
+        if self.algorithm not in SUPPORTED_ALGORITHMS:
             raise ValueError(f"不支持的哈希算法: {self.algorithm}")
+        if chunk_size <= 0:
+            raise ValueError(f"块大小必须是正整数: {chunk_size}")
 
-    def calculate(self, file_path: str) -> str:
+    def calculate(self, file_path: str, size: Optional[int] = None) -> str:
         """
         计算指定文件的哈希值，并返回十六进制表示。
 
         参数:
           - file_path (str): 文件路径
+          - size (Optional[int]): 已知的文件大小（字节），用于选择读取方式；未提供时在打开文件后获取
 
         返回:
           - str: 文件的哈希值
 
         异常:
-          - FileNotFoundError: 当文件不存在时
+          - FileNotFoundError: 当文件不存在或不是普通文件时
           - ValueError: 当使用的算法不受支持时
         """
-        if not os.path.isfile(file_path):
+        if self.algorithm == 'blake3':
+            # blake3 自行映射文件并使用 SIMD 和多线程并行计算
+            hash_obj = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            try:
+                hash_obj.update_mmap(file_path)
+            except (FileNotFoundError, IsADirectoryError):
+                raise FileNotFoundError(f"找不到文件: {file_path}")
+            return hash_obj.hexdigest()
+
+        # 直接打开文件，由 open 判断文件是否存在，不再单独 stat 一次
+        try:
+            file = open(file_path, 'rb', buffering=0)
+        except (FileNotFoundError, IsADirectoryError):
             raise FileNotFoundError(f"找不到文件: {file_path}")
 
-        hash_obj = hashlib.new(self.algorithm)
-        with open(file_path, 'rb') as file:
-            while True:
-                data = file.read(self.chunk_size)
-                if not data:
-                    break
-                hash_obj.update(data)
+        hash_obj = new_hasher(self.algorithm)
+        with file:
+            fd = file.fileno()
+            _advise_sequential(fd)
+            if size is None:
+                size = os.fstat(fd).st_size
+            mapped = None
+            if size > MMAP_THRESHOLD:
+                try:
+                    mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # 传入的大小只用于选择读取方式；文件在获取大小后被截断为空时无法映射，改用 readinto 读取
+                    mapped = None
+            if mapped is not None:
+                # 大文件映射到内存后按块送入哈希对象，省去 read 调用和用户态复制
+                drop_cache = size > DROP_CACHE_THRESHOLD
+                dropped = 0
+                with mapped, memoryview(mapped) as view:
+                    if drop_cache and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                        # 超大文件只读一遍，提示内核积极预读并尽快回收已访问的页
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    # 让内核异步预读后面的内容，使磁盘读取与哈希计算重叠。已预读部分不足一个窗口时
+                    # 才再提示一次，madvise 调用次数不随客户端指定的块大小增加
+                    ahead = max(PREFETCH_WINDOW, self.chunk_size)
+                    prefetched = 0
+                    for offset in range(0, len(view), self.chunk_size):
+                        if offset + ahead > prefetched:
+                            start = max(prefetched, offset)
+                            prefetched = offset + 2 * ahead
+                            _prefetch(mapped, start, prefetched - start)
+                        hash_obj.update(view[offset:offset + self.chunk_size])
+                        if drop_cache and offset - dropped >= DROP_CACHE_INTERVAL:
+                            # 内核不会释放仍被映射的页，先解除已计算部分的映射，再释放其页缓存
+                            _unmap_range(mapped, dropped, offset - dropped)
+                            _drop_cache(fd, dropped, offset - dropped)
+                            dropped = offset
+                if drop_cache:
+                    # 映射已关闭，释放整个文件的页缓存
+                    _drop_cache(fd, 0, 0)
+            else:
+                # 小文件读入按文件大小分配的缓冲区（readinto），不为每个块创建 bytes 对象；
+                # 每次 update 传入整块 memoryview，hashlib 在计算时释放 GIL。
+                # 缓冲区比文件大 1 字节，文件大小准确时第一次读取就不会读满缓冲区
+                buffer = memoryview(bytearray(min(self.chunk_size, size + 1)))
+                while True:
+                    length = file.readinto(buffer)
+                    if not length:
+                        break
+                    hash_obj.update(buffer[:length])
+                    if length == len(buffer) < self.chunk_size:
+                        # 缓冲区读满说明传入的文件大小已过时（文件在获取大小后变大），
+                        # 换成完整块大小的缓冲区，避免以很小的块读取文件的剩余部分
+                        buffer = memoryview(bytearray(self.chunk_size))
         return hash_obj.hexdigest()
 
+    def calculate_many(self, file_paths: Iterable[str]) -> Iterator[Tuple[Optional[str], Optional[Exception]]]:
+        """
+        依次计算多个文件的哈希值，适合批量处理大量小文件。
+        所有文件共用同一个读取缓冲区（readinto），不会为每个文件、每个块分配新的 bytes 对象。
+
+        参数:
+          - file_paths (Iterable[str]): 文件路径
+
+        返回:
+          - Iterator[Tuple[Optional[str], Optional[Exception]]]: 按输入顺序逐个产出 (哈希值, 异常)，
+            计算成功时异常为 None，失败时哈希值为 None
+        """
+        buffer = memoryview(bytearray(self.chunk_size))
+        for file_path in file_paths:
+            try:
+                hash_obj = new_hasher(self.algorithm)
+                with open(file_path, 'rb', buffering=0) as file:
+                    while True:
+                        size = file.readinto(buffer)
+                        if not size:
+                            break
+                        hash_obj.update(buffer[:size])
+                yield hash_obj.hexdigest(), None
+            except FileNotFoundError:
+                yield None, FileNotFoundError(f"找不到文件: {file_path}")
+            except Exception as e:
+                yield None, e
+
+@lru_cache(maxsize=8)
+def get_calculator(algorithm: str = 'sha256', chunk_size: int = DEFAULT_CHUNK_SIZE) -> FileHashCalculator:
+    """
+    获取按 (算法, 块大小) 缓存的 FileHashCalculator 实例。
+    实例不保存计算过程中的状态，可在多个线程间共享。
+
+    参数:
+      - algorithm (str): 哈希算法，默认 'sha256'
+      - chunk_size (int): 每次读取的块大小（字节），默认 1048576（1 MiB）
+
+    返回:
+      - FileHashCalculator: 计算器实例
+
+    异常:
+      - ValueError: 当使用的算法不受支持时
+    """
+    return FileHashCalculator(algorithm=algorithm, chunk_size=chunk_size)
+
+def calculate_file_hash(
+    file_path: str, algorithm: str = 'sha256', chunk_size: int = DEFAULT_CHUNK_SIZE, size: Optional[int] = None
+) -> str:
+    """
+    计算单个文件的哈希值。该函数定义在模块顶层，可以被 pickle，
+    因此可直接作为线程池或进程池任务提交。
+
+    参数:
+      - file_path (str): 文件路径
+      - algorithm (str): 哈希算法，默认 'sha256'
+      - chunk_size (int): 每次读取的块大小（字节），默认 1048576（1 MiB）
+      - size (Optional[int]): 已知的文件大小（字节），默认 None
+
+    返回:
+      - str: 文件的哈希值
+    """
+    return get_calculator(algorithm, chunk_size).calculate(file_path, size)
+
 def main():
     parser = argparse.ArgumentParser(
         description="计算文件哈希值，支持 Python 3.11.5 环境下的多种哈希算法及分块读取。"
     )
     parser.add_argument('--file', required=True, help="目标文件路径")
     parser.add_argument('--algorithm', default='sha256', help="使用的哈希算法 (默认：sha256)")
-    parser.add_argument('--chunk-size', type=int, default=4096, help="读取块大小（字节，默认：4096）")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="读取块大小（字节，默认：1048576）")
     args = parser.parse_args()
 
     try:
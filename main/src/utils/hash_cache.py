@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+HashCache 模块
+---------------------
+基于 SQLite 的持久化文件哈希缓存。以 (文件路径, 算法) 为键记录文件大小和修改时间，
+文件未发生变化时直接返回缓存的哈希值，无需重新读取文件。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+def _ensure_private_file(path: str):
+    """
+    以 0600 权限创建数据库文件（SQLite 创建的 -wal/-shm 文件沿用相同权限）。
+    文件已存在时要求属于当前用户且其他用户无法访问，防止他人预先创建数据库并写入伪造的哈希值。
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        file_stat = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if hasattr(os, "getuid") and (file_stat.st_uid != os.getuid() or file_stat.st_mode & 0o077):
+        raise PermissionError(f"哈希缓存数据库必须仅属主可访问: {path}")
+
+class HashCache:
+    # 每写入多少条记录检查一次缓存容量
+    EVICT_INTERVAL = 1000
+
+    def __init__(self, db_path: str, max_entries: int = 100000):
+        """
+        初始化 HashCache 实例，数据库文件不存在时自动创建
+
+        参数:
+          - db_path (str): SQLite 数据库文件路径
+          - max_entries (int): 最多保留的记录数，超出时按最近访问时间淘汰，默认 100000
+
+        异常:
+          - OSError: 当数据库文件无法创建、不属于当前用户或其他用户可以访问时
+          - sqlite3.Error: 当数据库无法打开或初始化时
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        _ensure_private_file(db_path)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hash ("
+                "path TEXT NOT NULL, algorithm TEXT NOT NULL, size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, hash_value TEXT NOT NULL, accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (path, algorithm))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_file_hash_accessed_at ON file_hash (accessed_at)"
+            )
+
+    def get(self, path: str, algorithm: str, size: int, mtime_ns: int) -> Optional[str]:
+        """
+        查询文件的缓存哈希值
+
+        参数:
+          - path (str): 文件路径
+          - algorithm (str): 哈希算法
+          - size (int): 文件当前大小（字节）
+          - mtime_ns (int): 文件当前修改时间（纳秒）
+
+        返回:
+          - Optional[str]: 文件大小和修改时间均与缓存记录一致时返回哈希值，否则返回 None
+
+        查询不更新记录的最近访问时间，命中的记录应在批量处理结束后通过 touch_many 统一更新，
+        避免每次命中都提交一次事务。
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, hash_value FROM file_hash WHERE path = ? AND algorithm = ?",
+                (path, algorithm)
+            ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        return row[2]
+
+    def touch_many(self, keys: Iterable[Tuple[str, str]]):
+        """
+        在一个事务中批量更新记录的最近访问时间，供淘汰时判断哪些记录仍在使用
+
+        参数:
+          - keys (Iterable[Tuple[str, str]]): (文件路径, 哈希算法)
+        """
+        accessed_at = time.time()
+        rows = [(accessed_at, path, algorithm) for path, algorithm in keys]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE file_hash SET accessed_at = ? WHERE path = ? AND algorithm = ?",
+                rows
+            )
+
+    def set(self, path: str, algorithm: str, size: int, mtime_ns: int, hash_value: str):
+        """
+        写入或更新文件的缓存哈希值
+
+        参数:
+          - path (str): 文件路径
+          - algorithm (str): 哈希算法
+          - size (int): 计算哈希时的文件大小（字节）
+          - mtime_ns (int): 计算哈希时的文件修改时间（纳秒）
+          - hash_value (str): 文件的哈希值
+        """
+        self.set_many([(path, algorithm, size, mtime_ns, hash_value)])
+
+    def set_many(self, entries: Iterable[Tuple[str, str, int, int, str]]):
+        """
+        在一个事务中批量写入或更新缓存哈希值，比逐条调用 set 少了每条记录一次的提交开销
+
+        参数:
+          - entries (Iterable[Tuple[str, str, int, int, str]]): (文件路径, 哈希算法, 文件大小, 修改时间（纳秒）, 哈希值)
+        """
+        accessed_at = time.time()
+        rows = [entry + (accessed_at,) for entry in entries]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO file_hash "
+                "(path, algorithm, size, mtime_ns, hash_value, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            previous_writes = self._writes
+            self._writes += len(rows)
+            if self._writes // self.EVICT_INTERVAL != previous_writes // self.EVICT_INTERVAL:
+                self._evict()
+
+    def _evict(self):
+        """按最近访问时间淘汰超出容量的记录（调用方需持有锁）"""
+        self._conn.execute(
+            "DELETE FROM file_hash WHERE rowid IN ("
+            "SELECT rowid FROM file_hash ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )